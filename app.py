@@ -351,6 +351,32 @@ def generate_question(subject):
     return q
 
 # --- 6. 介面邏輯 ---
+def recover_hp(ud):
+    # 每 30 分鐘回復一點體力，回傳距離上次回復的秒數
+    now = time.time()
+    elapsed = now - ud['last_hp_time']
+    rec = int(elapsed // 1800)
+    if rec > 0 and ud['hp'] < 10:
+        ud['hp'] = min(10, ud['hp'] + rec)
+        ud['last_hp_time'] = now - (elapsed % 1800)
+        save_user_to_sheet(st.session_state.current_user, ud)
+        st.toast("體力已回復！")
+    return elapsed % 1800
+
+@st.fragment(run_every=60)
+def render_hp_status():
+    """下課時的側邊欄體力，每分鐘自行刷新一次即可 (上課中改由答題區顯示)。"""
+    ud = get_user_data()
+    elapsed = recover_hp(ud)
+
+    hp = ud['hp']
+    st.markdown(f"<div style='font-size:20px; color:#c62828'>{'❤️'*hp}{'🤍'*(10-hp)}</div>", unsafe_allow_html=True)
+    if hp < 10:
+        mins = int((1800 - (elapsed % 1800)) // 60)
+        st.caption(f"⏳ 下一點回復：約 {mins} 分鐘")
+    else:
+        st.caption("體力已滿")
+
 with st.sidebar:
     st.markdown("<h1 style='text-align: center;'>🏰 霍格華茲</h1>", unsafe_allow_html=True)
     
@@ -390,23 +416,9 @@ with st.sidebar:
     
     else:
         ud = get_user_data()
-        now = time.time()
-        elapsed = now - ud['last_hp_time']
-        rec = int(elapsed // 1800)
-        if rec > 0 and ud['hp'] < 10:
-            ud['hp'] = min(10, ud['hp'] + rec)
-            ud['last_hp_time'] = now - (elapsed % 1800)
-            save_user_to_sheet(st.session_state.current_user, ud)
-            st.toast("體力已回復！")
-
-        hp = ud['hp']
         st.markdown(f"## 🎓 {st.session_state.current_user}")
-        st.markdown(f"<div style='font-size:20px; color:#c62828'>{'❤️'*hp}{'🤍'*(10-hp)}</div>", unsafe_allow_html=True)
-        if hp < 10:
-            mins = int((1800 - (elapsed % 1800)) // 60)
-            st.caption(f"⏳ 下一點回復：約 {mins} 分鐘")
-        else:
-            st.caption("體力已滿")
+        if not st.session_state.is_playing:
+            render_hp_status()
 
         if st.button("登出"):
             st.session_state.is_logged_in = False
@@ -428,7 +440,10 @@ with st.sidebar:
             
         st.markdown("---")
         
-        if st.session_state.selected_subject == "全部學科":
+        if st.session_state.is_playing:
+            # 上課中只重跑答題區，側邊欄不會更新，避免顯示兩份不一致的狀態
+            st.caption("📖 上課中：體力與進度顯示在題目上方")
+        elif st.session_state.selected_subject == "全部學科":
             st.warning("⚠️ 自由練習模式")
         else:
             s_stats = get_subject_stats(ud, st.session_state.selected_subject)
@@ -454,7 +469,115 @@ tab1, tab2, tab3 = st.tabs(["⚡ 咒語修練", "🏆 學院布告欄", "🔮 
 if 'last_result' not in st.session_state: st.session_state.last_result = None
 if 'show_cert' not in st.session_state: st.session_state.show_cert = False
 
-with tab1:
+# 答題區的按鈕回呼：先更新狀態，fragment 重跑時就會畫出新畫面 (不需 st.rerun)
+# 回呼不像 if st.button(...) 只在按鈕畫出時才執行，連點或延遲送達的點擊都會觸發，要先檢查狀態
+def claim_certificate(subj, cert_type):
+    if not st.session_state.show_cert: return
+    ud = get_user_data()
+    s_stats = get_subject_stats(ud, subj)
+    if cert_type == "level_up":
+        # 升級徽章
+        curr = s_stats['level']
+        new_badge = ""
+        if curr == 1: new_badge = "📜 初級咒語合格"
+        elif curr == 2: new_badge = "🦌 守護神召喚師"
+        elif curr == 3: new_badge = "🎓 O.W.L.s 傑出巫師"
+        
+        if new_badge and new_badge not in ud['badges']:
+            ud['badges'].append(new_badge)
+            
+        s_stats['level'] += 1
+        s_stats['level_correct'] = 0
+        s_stats['streak'] = 0
+    else:
+        badge = f"{subj}大師"
+        if badge not in ud['badges']: ud['badges'].append(badge)
+    
+    update_subject_stats(ud, subj, s_stats)
+    st.session_state.show_cert = False
+    st.session_state.current_q = None
+    st.session_state.waiting_for_next = False
+
+def next_question():
+    st.session_state.last_result = None
+    st.session_state.current_q = None
+    st.session_state.waiting_for_next = False
+
+def cast_spell(q, subj):
+    if st.session_state.waiting_for_next or st.session_state.show_cert: return
+    ud = get_user_data()
+    ans = st.session_state.get('ans_input')
+    ud['hp'] -= 1
+    corr = False
+    if ans and ans.strip() == q['ans']:
+        corr = True
+        ud['hp'] += 1
+        ud['xp'] += 10
+        if subj != "全部學科":
+            s_stats = get_subject_stats(ud, subj)
+            s_stats['level_correct'] += 1
+            s_stats['streak'] += 1
+            if s_stats['streak'] > s_stats['max_streak']: s_stats['max_streak'] = s_stats['streak']
+            
+            # 連對30徽章
+            if s_stats['streak'] == 30:
+                streak_badge = "🔥 火閃電騎士"
+                if streak_badge not in ud['badges']:
+                    ud['badges'].append(streak_badge)
+                    st.toast(f"🏅 獲得成就：{streak_badge}！")
+                    
+            update_subject_stats(ud, subj, s_stats)
+        else:
+            save_user_to_sheet(st.session_state.current_user, ud)
+    else:
+        if subj != "全部學科":
+            s_stats = get_subject_stats(ud, subj)
+            s_stats['streak'] = 0
+            update_subject_stats(ud, subj, s_stats)
+        
+        found = False
+        for item in ud['wrong_list']:
+            if item['成語'] == q['row']['成語']:
+                item['count'] = item.get('count', 1) + 1
+                item['誤答'] = ans 
+                found = True
+                break
+        if not found:
+            ud['wrong_list'].append({'成語': q['row']['成語'], '誤答': ans, 'count': 1})
+
+        save_user_to_sheet(st.session_state.current_user, ud)
+    
+    st.session_state.last_result = {'correct': corr, 'ans': q['ans'], 'row_data': q['row']}
+    st.session_state.waiting_for_next = True
+    
+    if subj != "全部學科":
+        s_stats = get_subject_stats(ud, subj)
+        cfg = LEVELS[s_stats['level']]
+        if s_stats['level_correct'] >= cfg['target'] and s_stats['streak'] >= cfg['streak_req']:
+            st.session_state.show_cert = True
+            st.session_state.cert_type = "master" if s_stats['level'] == 4 else "level_up"
+            st.session_state.waiting_for_next = False
+
+def render_quiz_status(ud, subj):
+    # 上課中唯一的體力與進度顯示，跟著答題區一起更新
+    recover_hp(ud)
+    hp = ud['hp']
+    status = f"{'❤️'*hp}{'🤍'*(10-hp)}"
+    if subj != "全部學科":
+        s_stats = get_subject_stats(ud, subj)
+        cfg = LEVELS[s_stats['level']]
+        status += f"　🎓 {cfg['name']} ({cfg['desc']})　✅ 累積答對：{s_stats['level_correct']} / {cfg['target']}"
+        if cfg['streak_req'] > 0:
+            status += f"　🔥 連續答對：{s_stats['streak']} / {cfg['streak_req']}"
+    st.caption(status)
+
+@st.fragment
+def render_quiz():
+    """
+    ★ 答題區 fragment ★
+    施法、下一題、升級只重跑這一區 (狀態在按鈕回呼裡更新)，
+    不再重新注入 CSS、繪製排行榜與錯題表。
+    """
     if not st.session_state.is_logged_in:
         st.info("👈 請先在左側登入或註冊。")
     else:
@@ -481,7 +604,7 @@ with tab1:
             st.write("")
             if st.button("🚀 開始上課", type="primary"):
                 st.session_state.is_playing = True
-                st.rerun()
+                st.rerun() # 整頁重跑，讓側邊欄收起體力與進度
             
             # ★★★ 新增：徽章收藏櫃 ★★★
             st.markdown("---")
@@ -495,6 +618,8 @@ with tab1:
                 st.caption("尚未獲得任何徽章，快去修練吧！")
 
         else:
+            render_quiz_status(ud, subj)
+
             if st.session_state.show_cert:
                 cert_type = st.session_state.get('cert_type')
                 if cert_type == "level_up":
@@ -503,31 +628,7 @@ with tab1:
                     title, body, btn = "🏆 宗師證書 🏆", f"恭喜成為 {subj} 大師！", "領取"
                 
                 st.markdown(f"""<div class="certificate-box"><div class="magic-font" style="font-size:3em;">{title}</div><p>{body}</p></div>""", unsafe_allow_html=True)
-                if st.button(btn, use_container_width=True):
-                    s_stats = get_subject_stats(ud, subj)
-                    if cert_type == "level_up":
-                        # 升級徽章
-                        curr = s_stats['level']
-                        new_badge = ""
-                        if curr == 1: new_badge = "📜 初級咒語合格"
-                        elif curr == 2: new_badge = "🦌 守護神召喚師"
-                        elif curr == 3: new_badge = "🎓 O.W.L.s 傑出巫師"
-                        
-                        if new_badge and new_badge not in ud['badges']:
-                            ud['badges'].append(new_badge)
-                            
-                        s_stats['level'] += 1
-                        s_stats['level_correct'] = 0
-                        s_stats['streak'] = 0
-                    else:
-                        badge = f"{subj}大師"
-                        if badge not in ud['badges']: ud['badges'].append(badge)
-                    
-                    update_subject_stats(ud, subj, s_stats)
-                    st.session_state.show_cert = False
-                    st.session_state.current_q = None
-                    st.session_state.waiting_for_next = False
-                    st.rerun()
+                st.button(btn, use_container_width=True, on_click=claim_certificate, args=(subj, cert_type))
             
             elif st.session_state.waiting_for_next and st.session_state.last_result:
                 res = st.session_state.last_result
@@ -556,17 +657,13 @@ with tab1:
                         c2.markdown(f'<div class="review-text"><strong>反義詞</strong>：{row["反義詞"]}</div>', unsafe_allow_html=True)
                 
                 st.write("---")
-                if st.button("下一題 ➡️"):
-                    st.session_state.last_result = None
-                    st.session_state.current_q = None
-                    st.session_state.waiting_for_next = False
-                    st.rerun()
+                st.button("下一題 ➡️", on_click=next_question)
 
             else:
                 if st.button("🔙 下課休息"):
                     st.session_state.is_playing = False
                     st.session_state.current_q = None
-                    st.rerun()
+                    st.rerun() # 整頁重跑，同步側邊欄與錯題表
 
                 if ud['hp'] <= 0:
                     st.error("💀 體力耗盡！請休息一下。")
@@ -586,67 +683,15 @@ with tab1:
 
                         with st.form("ans"):
                             if q['type'] in ['def', 'sent']: 
-                                ans = st.radio("選項：", q['options'])
+                                st.radio("選項：", q['options'], key="ans_input")
                             elif q['type'] == 'fill': 
-                                ans = st.text_input("填字：", max_chars=1)
+                                st.text_input("填字：", max_chars=1, key="ans_input")
                             elif q['type'] == 'chal': 
-                                ans = st.text_input("成語：")
-                            sub = st.form_submit_button("🪄 施法")
-                        
-                        if sub:
-                            ud['hp'] -= 1
-                            corr = False
-                            if ans and ans.strip() == q['ans']:
-                                corr = True
-                                ud['hp'] += 1
-                                ud['xp'] += 10
-                                if subj != "全部學科":
-                                    s_stats = get_subject_stats(ud, subj)
-                                    s_stats['level_correct'] += 1
-                                    s_stats['streak'] += 1
-                                    if s_stats['streak'] > s_stats['max_streak']: s_stats['max_streak'] = s_stats['streak']
-                                    
-                                    # 連對30徽章
-                                    if s_stats['streak'] == 30:
-                                        streak_badge = "🔥 火閃電騎士"
-                                        if streak_badge not in ud['badges']:
-                                            ud['badges'].append(streak_badge)
-                                            st.toast(f"🏅 獲得成就：{streak_badge}！")
-                                            
-                                    update_subject_stats(ud, subj, s_stats)
-                                else:
-                                    save_user_to_sheet(st.session_state.current_user, ud)
-                            else:
-                                if subj != "全部學科":
-                                    s_stats = get_subject_stats(ud, subj)
-                                    s_stats['streak'] = 0
-                                    update_subject_stats(ud, subj, s_stats)
-                                
-                                found = False
-                                for item in ud['wrong_list']:
-                                    if item['成語'] == q['row']['成語']:
-                                        item['count'] = item.get('count', 1) + 1
-                                        item['誤答'] = ans 
-                                        found = True
-                                        break
-                                if not found:
-                                    ud['wrong_list'].append({'成語': q['row']['成語'], '誤答': ans, 'count': 1})
-
-                                save_user_to_sheet(st.session_state.current_user, ud)
-                            
-                            st.session_state.last_result = {'correct': corr, 'ans': q['ans'], 'row_data': q['row']}
-                            st.session_state.waiting_for_next = True
-                            
-                            if subj != "全部學科":
-                                s_stats = get_subject_stats(ud, subj)
-                                cfg = LEVELS[s_stats['level']]
-                                if s_stats['level_correct'] >= cfg['target'] and s_stats['streak'] >= cfg['streak_req']:
-                                    st.session_state.show_cert = True
-                                    st.session_state.cert_type = "master" if s_stats['level'] == 4 else "level_up"
-                                    st.session_state.waiting_for_next = False
-                            st.rerun()
+                                st.text_input("成語：", key="ans_input")
+                            st.form_submit_button("🪄 施法", on_click=cast_spell, args=(q, subj))
 
-with tab2:
+@st.fragment
+def render_leaderboard():
     st.markdown("### 🏆 霍格華茲風雲榜")
     if st.button("🔄 更新排名"):
         st.session_state.user_db = load_db_from_sheet()
@@ -659,7 +704,8 @@ with tab2:
         df_rank = pd.DataFrame(data).sort_values("總XP", ascending=False)
         st.dataframe(df_rank, hide_index=True, use_container_width=True)
 
-with tab3:
+@st.fragment
+def render_wrong_list():
     if st.session_state.is_logged_in:
         ud = get_user_data()
         if ud['wrong_list']:
@@ -674,5 +720,14 @@ with tab3:
             if st.button("清除錯題"):
                 ud['wrong_list'] = []
                 save_user_to_sheet(st.session_state.current_user, ud)
-                st.rerun()
+                st.rerun() # 整頁重跑，首頁的錯題數才會更新
         else: st.write("無錯題紀錄")
+
+with tab1:
+    render_quiz()
+
+with tab2:
+    render_leaderboard()
+
+with tab3:
+    render_wrong_list()
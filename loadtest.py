@@ -0,0 +1,367 @@
+"""
+霍格華茲成語學院 —— 全班上課容量估算
+
+以 streamlit.testing.v1.AppTest 無頭執行真正的 app.py，
+並把 Google Sheets 換成行程內的假工作表 (模擬延遲與配額錯誤)。
+
+AppTest 不能多執行緒同時跑，所以各 session 是在單一執行緒裡輪流執行，
+「同時上課」只體現在虛擬時鐘與 Sheets 配額上：延遲是沒有互相競爭的單一
+session 數字。一個行程能撐幾位學生，改由每位學生每分鐘消耗的 CPU 秒數
+與 Sheets 呼叫次數推算。AppTest 每次都重跑整份腳本，CPU 數字是上限。
+
+用法：
+    python loadtest.py --users 200 --questions 10
+
+報告內容：
+    * 各動作 (登入、答題、下一題、升級、更新排名…) 的延遲百分位數與 CPU 時間
+    * 每位學生每分鐘的 CPU 秒數 -> 單核可服務的學生數
+    * 每位學生每分鐘的 Sheets 呼叫次數 -> 配額可服務的學生數 (以 --think-time 模擬作答間隔)
+    * 每個 session 的常駐記憶體 (RSS，Windows 無法量測)
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from unittest import mock
+
+import gspread
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "app.py")
+
+HEADERS = ['Name', 'Password', 'XP', 'HP', 'Last_HP_Time', 'Badges', 'Wrong_List', 'Subject_Stats']
+PASSWORD = "1234"
+FREE_MODE = "全部學科"
+LEVEL_UP_SUBJECT = "符咒學"  # sorting_hat 的預設學科，幾乎一定存在
+# 差一題就升級 (一年級：累積 90、連對 20)
+NEAR_LEVEL_UP = {'level': 1, 'level_correct': 89, 'streak': 19, 'max_streak': 19}
+
+
+# --- 1. 虛擬時鐘 ---
+class VirtualClock:
+    """學生的思考時間不真的等待，只推進這個時鐘 (配額視窗也以它計算)。"""
+    def __init__(self):
+        self.now = 0.0
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+# --- 2. 假的 gspread ---
+class _QuotaResponse:
+    """模仿 requests.Response，讓 gspread.exceptions.APIError 能正常建立。"""
+    status_code = 429
+    text = '{"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}}'
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeWorksheet:
+    """
+    行程內的工作表：
+    每次呼叫都會 sleep 模擬網路延遲，並以 60 秒滑動視窗檢查讀 / 寫配額，
+    超過時丟出與真實 API 相同的 APIError (429)。
+    """
+    def __init__(self, clock, latency, read_quota, write_quota):
+        self.clock = clock
+        self.latency = latency
+        self.quota = {'read': read_quota, 'write': write_quota}
+        self.rows = [list(HEADERS)]
+        self.calls = defaultdict(int)
+        self.kind_calls = defaultdict(int)
+        self.quota_errors = 0
+        self._window = {'read': [], 'write': []}
+        self._lock = threading.Lock()
+
+    def _call(self, method, kind):
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+        with self._lock:
+            self.calls[method] += 1
+            self.kind_calls[kind] += 1
+            window = self._window[kind]
+            cutoff = self.clock.now - 60
+            while window and window[0] <= cutoff:
+                window.pop(0)
+            if len(window) >= self.quota[kind]:
+                self.quota_errors += 1
+                raise gspread.exceptions.APIError(_QuotaResponse())
+            window.append(self.clock.now)
+
+    def get_all_values(self):
+        self._call('get_all_values', 'read')
+        return [[str(v) for v in row] for row in self.rows]
+
+    def update(self, range_name, values):
+        self._call('update', 'write')
+        r = int(range_name.split(':')[0][1:])
+        while len(self.rows) < r:
+            self.rows.append([''] * len(HEADERS))
+        self.rows[r - 1] = list(values[0])
+
+    def append_row(self, values):
+        self._call('append_row', 'write')
+        self.rows.append(list(values))
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet):
+        self.sheet1 = worksheet
+
+
+class FakeClient:
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def open_by_url(self, url):
+        # 真實的 open_by_url 會抓一次試算表 metadata，也算一次讀取
+        self.worksheet._call('open_by_url', 'read')
+        return FakeSpreadsheet(self.worksheet)
+
+
+def seed_students(sheet, n_users, level_up_ratio):
+    names = [f"student{i:03d}" for i in range(n_users)]
+    n_level_up = int(n_users * level_up_ratio)
+    for i, name in enumerate(names):
+        stats = {LEVEL_UP_SUBJECT: NEAR_LEVEL_UP} if i < n_level_up else {}
+        sheet.rows.append([
+            name, "'" + PASSWORD, 0, 10, time.time(), "", "[]",
+            json.dumps(stats, ensure_ascii=False)
+        ])
+    return names, set(names[:n_level_up])
+
+
+# --- 3. 模擬學生 ---
+def _find(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    return None
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.clock = VirtualClock()
+        self.sheet = FakeWorksheet(self.clock, args.latency_ms / 1000,
+                                   args.read_quota, args.write_quota)
+        self.client = FakeClient(self.sheet)
+        self.timings = defaultdict(list)
+        self.cpu = defaultdict(float)  # 動作 -> 累計 CPU 秒數
+        self.failures = defaultdict(int)
+        self.sessions = []
+        self.spans = {}  # 學生 -> [第一個動作, 最後一個動作] 的虛擬時間
+
+    def new_session(self):
+        at = AppTest.from_file(APP_PATH, default_timeout=self.args.timeout)
+        at.secrets["gcp_service_account"] = {"type": "service_account"}
+        return at
+
+    def timed(self, name, action, at, fn):
+        """執行一個動作並記錄延遲；腳本拋出例外或逾時 (RuntimeError) 都計為失敗。"""
+        span = self.spans.setdefault(name, [self.clock.now, self.clock.now])
+        span[1] = self.clock.now
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            fn()
+        except Exception:
+            self.timings[action].append(time.perf_counter() - start)
+            self.cpu[action] += time.process_time() - cpu_start
+            self.failures[action] += 1
+            return False
+        self.timings[action].append(time.perf_counter() - start)
+        self.cpu[action] += time.process_time() - cpu_start
+        if at.exception:
+            self.failures[action] += 1
+            return False
+        return True
+
+    def student(self, name, level_up):
+        """一位學生的完整流程，每做完一個動作就 yield 一次讓其他學生插隊。"""
+        at = self.new_session()
+        self.sessions.append(at)
+        if not self.timed(name, "open", at, at.run):
+            return
+        yield
+
+        who = _find(at.sidebar.selectbox, "巫師姓名")
+        if who is None or name not in who.options:
+            self.failures["login"] += 1
+            return
+        who.select(name)
+        at.sidebar.text_input(key="l_pw").input(PASSWORD)
+        if not self.timed(name, "login", at, _find(at.sidebar.button, "進入學院").click().run):
+            return
+        yield
+
+        course = _find(at.sidebar.selectbox, "📚 選修課程")
+        if course is None:
+            self.failures["login"] += 1
+            return
+        subjects = [s for s in course.options if s != FREE_MODE]
+        subj = LEVEL_UP_SUBJECT if level_up and LEVEL_UP_SUBJECT in subjects else random.choice(subjects)
+        if not self.timed(name, "subject", at, course.select(subj).run):
+            return
+        yield
+
+        if not self.timed(name, "start", at, _find(at.button, "🚀 開始上課").click().run):
+            return
+        yield
+
+        for i in range(self.args.questions):
+            cert = _find(at.button, "晉升") or _find(at.button, "領取")
+            if cert is not None:
+                if not self.timed(name, "level_up", at, cert.click().run):
+                    return
+                yield
+
+            q = at.session_state["current_q"] if "current_q" in at.session_state else None
+            cast = _find(at.button, "🪄 施法")
+            if q is None or cast is None:
+                self.failures["answer (hp/quota)"] += 1
+            else:
+                correct = random.random() < self.args.accuracy
+                if q['type'] in ['def', 'sent']:
+                    wrong = [o for o in q['options'] if o != q['ans']]
+                    at.radio[0].set_value(q['ans'] if correct else random.choice(wrong))
+                else:
+                    at.text_input[0].input(q['ans'] if correct else "錯")
+                if not self.timed(name, "answer", at, cast.click().run):
+                    return
+                yield
+
+                nxt = _find(at.button, "下一題 ➡️")
+                if nxt is not None:
+                    if not self.timed(name, "next", at, nxt.click().run):
+                        return
+                    yield
+
+            if self.args.refresh_every and (i + 1) % self.args.refresh_every == 0:
+                if not self.timed(name, "leaderboard", at, _find(at.button, "🔄 更新排名").click().run):
+                    return
+                yield
+
+    def run(self):
+        names, level_up = seed_students(self.sheet, self.args.users, self.args.level_up_ratio)
+
+        with mock.patch("gspread.authorize", return_value=self.client), \
+             mock.patch("oauth2client.service_account.ServiceAccountCredentials.from_json_keyfile_dict",
+                        return_value=object()):
+            # 暖身：先載入 streamlit / pandas 與成語快取，不計入統計
+            self.new_session().run()
+            self.sheet.calls.clear()
+            self.sheet.kind_calls.clear()
+            rss_before = rss_bytes()
+
+            # 所有學生輪流各做一個動作；還在上課的學生各做一次 = 經過一段思考時間
+            active = [self.student(n, n in level_up) for n in names]
+            wall_start = time.perf_counter()
+            while active:
+                step = self.args.think_time / len(active)
+                still = []
+                for gen in active:
+                    try:
+                        next(gen)
+                        still.append(gen)
+                    except StopIteration:
+                        pass
+                    self.clock.advance(step)
+                active = still
+            wall = time.perf_counter() - wall_start
+            rss_after = rss_bytes()
+
+        self.report(len(names), wall, rss_before, rss_after)
+
+    def report(self, n_users, wall, rss_before, rss_after):
+        print(f"\n=== 容量估算結果：{n_users} 位學生，模擬 {self.clock.now / 60:.1f} 分鐘 (實際 {wall:.1f} 秒) ===\n")
+        print(f"{'動作':<20}{'次數':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'CPU ms':>10}{'失敗':>8}")
+        actions = list(self.timings) + [a for a in self.failures if a not in self.timings]
+        for action in actions:
+            xs = sorted(self.timings.get(action, []))
+            row = [percentile(xs, p) * 1000 for p in (50, 90, 99, 100)] if xs else [0] * 4
+            cpu_ms = self.cpu[action] / len(xs) * 1000 if xs else 0
+            print(f"{action:<20}{len(xs):>8}" + "".join(f"{v:>10.1f}" for v in row)
+                  + f"{cpu_ms:>10.1f}{self.failures[action]:>8}")
+
+        total = sum(self.sheet.calls.values())
+        # 只計算每位學生實際在線的時間 (最後一個動作也佔一段思考時間)
+        user_minutes = sum(last - first + self.args.think_time
+                           for first, last in self.spans.values()) / 60
+        cpu_total = sum(self.cpu.values())
+        print("\n--- CPU ---")
+        print(f"合計：{cpu_total:.1f} CPU 秒 (實際 {wall:.1f} 秒，虛擬 / 實際 = {self.clock.now / wall:.2f})")
+        if user_minutes and cpu_total:
+            per_student = cpu_total / user_minutes
+            print(f"每位學生每分鐘：{per_student:.3f} CPU 秒 -> 單核約可服務 {60 / per_student:.0f} 位學生")
+
+        print("\n--- Google Sheets ---")
+        for method, n in sorted(self.sheet.calls.items()):
+            print(f"{method:<20}{n:>8}")
+        print(f"{'合計':<20}{total:>8}")
+        if user_minutes:
+            print(f"每位學生每分鐘呼叫：{total / user_minutes:.2f} 次")
+            print(f"全體每分鐘呼叫：{total / (self.clock.now / 60):.1f} 次 "
+                  f"(配額 讀 {self.args.read_quota} / 寫 {self.args.write_quota})")
+            limits = [self.sheet.quota[kind] / (self.sheet.kind_calls[kind] / user_minutes)
+                      for kind in ('read', 'write') if self.sheet.kind_calls[kind]]
+            if limits:
+                print(f"配額約可服務 {min(limits):.0f} 位學生")
+        print(f"配額錯誤 (429)：{self.sheet.quota_errors} 次")
+
+        print("\n--- 記憶體 ---")
+        if not rss_after:
+            print("此平台無法量測 RSS")
+            return
+        print(f"RSS：{rss_before / 2**20:.1f} MiB -> {rss_after / 2**20:.1f} MiB")
+        print(f"每個 session：約 {(rss_after - rss_before) / max(1, len(self.sessions)) / 2**10:.1f} KiB")
+
+
+# --- 4. 工具函式 ---
+def percentile(sorted_values, p):
+    idx = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0  # Windows 沒有 resource 模組
+    # 非 Linux：只能拿到峰值 (macOS 單位為 bytes，其他為 KiB)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="霍格華茲成語學院全班上課容量估算")
+    parser.add_argument("--users", type=int, default=200, help="一起上課的學生數")
+    parser.add_argument("--questions", type=int, default=10, help="每位學生作答題數")
+    parser.add_argument("--think-time", type=float, default=10.0, help="學生兩個動作之間的思考秒數 (虛擬時間)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Sheets 每次呼叫的平均延遲")
+    parser.add_argument("--read-quota", type=int, default=60, help="每分鐘讀取配額 (服務帳戶預設 60)")
+    parser.add_argument("--write-quota", type=int, default=60, help="每分鐘寫入配額 (服務帳戶預設 60)")
+    parser.add_argument("--accuracy", type=float, default=0.8, help="答對機率")
+    parser.add_argument("--level-up-ratio", type=float, default=0.2, help="差一題就升級的學生比例")
+    parser.add_argument("--refresh-every", type=int, default=5, help="每答幾題更新一次排行榜 (0 = 不更新)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="單次腳本執行逾時秒數")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    os.chdir(APP_DIR)  # app.py 以相對路徑讀取 idioms.csv
+    LoadTest(args).run()
+
+
+if __name__ == "__main__":
+    main()